@@ -155,12 +155,28 @@ def perform_ocr_on_folder(folder_path, lang='en', x_threshold=20, y_threshold=20
     ocr_results = []
     total_files = len(files)
     
-    for i, filename in enumerate(sorted(files)):
-        image_path = os.path.join(folder_path, filename)
+    files = sorted(files)
+    image_paths = [os.path.join(folder_path, filename) for filename in files]
+
+    # Upcoming pages are decoded in the background while the current one runs through OCR
+    preloaded = processor.preload_images(image_paths)
+
+    for i, (filename, (image_path, image)) in enumerate(zip(files, preloaded)):
         remaining = total_files - (i + 1)
         log_callback(f"Processing: {filename} (Remaining: {remaining})")
+        if image is None:
+            # Already logged by load_image; passing img=None would only decode the file again
+            log_callback(f"Error processing {filename}: could not read image")
+            ocr_results.append({
+                "filename": filename,
+                "error": "could not read image"
+            })
+            continue
         try:
-            grouped_boxes, grouped_texts = processor.perform_ocr(image_path, x_threshold=x_threshold, y_threshold=y_threshold)
+            # The decoded image is dropped: rendering runs on a later Streamlit rerun (after
+            # translation), and keeping every decoded page in session state until then would
+            # hold the whole chapter in memory, so the render step decodes the file again
+            grouped_boxes, grouped_texts, _ = processor.perform_ocr(image_path, x_threshold=x_threshold, y_threshold=y_threshold, img=image)
             ocr_results.append({
                 "filename": filename,
                 "grouped_boxes": grouped_boxes,
@@ -300,6 +316,14 @@ if 'ocr_results' in st.session_state and st.session_state.ocr_results:
             # Translation Options
             st.subheader("Translation Options")
             translation_mode = st.radio("Output Format", ["JSON", "Text (Line-by-Line)"], horizontal=True)
+
+            # The Ollama translator caches results per payload/model/prompt; allow asking again
+            use_translation_cache = True
+            if provider_option == "Local LLM (Ollama)":
+                use_translation_cache = st.checkbox(
+                    "Reuse cached translation", value=True,
+                    help="Untick to ask the model again; the new result replaces the cached one."
+                )
             
             # Prompt Editing
             # We use the second column from the layout defined above for the prompt to save space? 
@@ -377,6 +401,8 @@ if 'ocr_results' in st.session_state and st.session_state.ocr_results:
                 # Add API key if in API mode
                 if provider_option == "API (OpenAI/Gemini/Groq)":
                     translate_kwargs["api_key"] = api_key_input
+                else:
+                    translate_kwargs["use_cache"] = use_translation_cache
 
                 # Call Translate
                 translation_result = current_translator.translate_text(**translate_kwargs)
@@ -469,6 +495,7 @@ if 'translated_lines' in st.session_state and st.session_state.translated_lines:
             os.makedirs(output_folder, exist_ok=True)
             
             # Initialize Tools
+            rendered = False
             try:
                 remover = TextRemover(log_level=logging.ERROR)
                 # typesetter is already initialized
@@ -495,8 +522,10 @@ if 'translated_lines' in st.session_state and st.session_state.translated_lines:
                         curr_translation_idx += num_lines
                         
                         # 1. Remove Text
-                        # Note: remover.remove_text returns a cv2 image (numpy array)
-                        cleaned_image_cv = remover.remove_text(original_path, res['grouped_boxes'])
+                        # Note: remover.remove_text takes and returns a cv2 image (numpy array).
+                        # The OCR pass decoded this page on an earlier rerun without keeping it.
+                        original_image_cv = cv2.imread(original_path)
+                        cleaned_image_cv = remover.remove_text(original_image_cv, res['grouped_boxes'])
                         
                         if cleaned_image_cv is not None:
                             # Save cleaned image temporarily (Typesetter currently expects a path)
@@ -507,7 +536,7 @@ if 'translated_lines' in st.session_state and st.session_state.translated_lines:
                             # 2. Overlay Text
                             final_path = os.path.join(output_folder, f"final_{filename}")
                             
-                            typesetter.overlay_text(
+                            final_image = typesetter.overlay_text(
                                 image_path=cleaned_path,
                                 grouped_boxes=res['grouped_boxes'], 
                                 grouped_texts=img_translations,
@@ -521,17 +550,27 @@ if 'translated_lines' in st.session_state and st.session_state.translated_lines:
                             with st.expander(f"Result: {filename}", expanded=True):
                                 col_orig, col_final = st.columns(2)
                                 col_orig.image(original_path, caption="Original")
-                                col_final.image(final_path, caption="Translated")
+                                # The file is still being written in the background; show the image in memory
+                                col_final.image(final_image, caption="Translated")
                         else:
                             st.error(f"Failed to remove text from {filename}")
                     
                     # Update Progress
                     status_bar.progress((i + 1) / total_images)
                 
-                status_text.text("Processing Complete!")
-                st.success(f"All images saved to: {output_folder}")
-                st.balloons()
+                rendered = True
                 
             except Exception as e:
                 st.error(f"An error occurred during rendering: {e}")
                 st.exception(e)
+            finally:
+                # Wait for the background saves even if rendering stopped early,
+                # so that every image that was not written gets reported
+                failed_saves = typesetter.flush()
+                for failed_path, save_error in failed_saves:
+                    st.error(f"Failed to save {failed_path}: {save_error}")
+
+            if rendered and not failed_saves:
+                status_text.text("Processing Complete!")
+                st.success(f"All images saved to: {output_folder}")
+                st.balloons()
@@ -1,5 +1,10 @@
 import logging
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import cv2
+import numpy as np
 from PIL import Image
 from paddleocr import PaddleOCR
 
@@ -14,6 +19,9 @@ class OCRProcessor:
             log_level (int): Logging level.
         """
         # Suppress PaddleOCR logging if needed, or configure it
+        # PaddleOCR 3.x dropped the show_log flag; its loggers are quieted directly instead
+        for paddle_logger in ("paddleocr", "paddlex"):
+            logging.getLogger(paddle_logger).setLevel(max(log_level, logging.WARNING))
         self.ocr = PaddleOCR(use_doc_orientation_classify=use_angle_cls, 
                             use_doc_unwarping=False, 
                             use_textline_orientation=False,
@@ -21,7 +29,54 @@ class OCRProcessor:
         logging.basicConfig(level=log_level)
         self.logger = logging.getLogger(__name__)
 
-    def perform_ocr(self, image_path, x_threshold=20, y_threshold=20):
+    def load_image(self, image_path):
+        """
+        Decodes an image file into a BGR numpy array.
+        Formats OpenCV cannot read (e.g. .webp on some builds, .gif) are decoded with PIL.
+        
+        Args:
+            image_path (str): Path to the image file.
+            
+        Returns:
+            numpy.ndarray: The decoded BGR image, or None if it could not be read.
+        """
+        img = cv2.imread(image_path)
+        if img is not None:
+            return img
+
+        try:
+            rgb = np.array(Image.open(image_path).convert("RGB"))
+            return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        except Exception as e:
+            self.logger.error(f"Failed to read image {image_path}: {e}")
+            return None
+
+    def preload_images(self, image_paths, prefetch=2):
+        """
+        Yields decoded images in order while the next ones are decoded in background threads.
+        OCR inference stays on the caller's thread (one PaddleOCR instance is not safe to share
+        across threads), but file I/O and decoding overlap with it.
+        
+        Args:
+            image_paths (list): Paths of the images to decode.
+            prefetch (int): Number of images decoded ahead of the consumer.
+            
+        Yields:
+            tuple: (image_path, img_bgr) where img_bgr is None if the image could not be read.
+        """
+        prefetch = max(1, prefetch)
+        paths = iter(image_paths)
+        with ThreadPoolExecutor(max_workers=prefetch) as pool:
+            pending = deque((path, pool.submit(self.load_image, path)) for path in islice(paths, prefetch))
+
+            while pending:
+                image_path, future = pending.popleft()
+                next_path = next(paths, None)
+                if next_path is not None:
+                    pending.append((next_path, pool.submit(self.load_image, next_path)))
+                yield image_path, future.result()
+
+    def perform_ocr(self, image_path, x_threshold=20, y_threshold=20, img=None):
         """
         Perform OCR on the given image and return the extracted text sorted by reading order.
         
@@ -29,40 +84,39 @@ class OCRProcessor:
             image_path (str): Path to the image file.
             x_threshold (int): Maximum horizontal gap for text grouping.
             y_threshold (int): Maximum vertical gap for text grouping.
+            img (numpy.ndarray, optional): Already decoded BGR image (e.g. from preload_images).
+                                           If None, the image is read from image_path.
+                                           Ignored for .pdf files.
             
         Returns:
-            list: A list of extracted text strings.
+            tuple: (grouped_boxes, grouped_texts, img_bgr) where img_bgr is the decoded
+                   image that was fed to PaddleOCR, so callers can reuse it without decoding again.
+                   img_bgr is None for .pdf files.
         """
         self.logger.info(f"Processing image: {image_path}")
         
-        # Check and convert image if necessary
-        file_ext = os.path.splitext(image_path)[1].lower()
-        supported_exts = ['.jpg', '.jpeg', '.png', '.bmp', '.pdf']
-        
-        if file_ext not in supported_exts:
-            self.logger.info(f"Unsupported file format {file_ext}. Converting to PNG...")
-            try:
-                img = Image.open(image_path).convert("RGB")
-                new_image_path = os.path.splitext(image_path)[0] + ".png"
-                img.save(new_image_path, "PNG")
-                self.logger.info(f"Saved converted image to: {new_image_path}")
-                image_path = new_image_path
-            except Exception as e:
-                self.logger.error(f"Failed to convert image {image_path}: {e}")
-                return [], []
-
-        result = self.ocr.predict(image_path)
+        if os.path.splitext(image_path)[1].lower() == '.pdf':
+            # PDFs cannot be decoded into a single array; PaddleOCR reads them from the path
+            img = None
+            result = self.ocr.predict(image_path)
+        else:
+            if img is None:
+                img = self.load_image(image_path)
+            if img is None:
+                return [], [], None
+
+            result = self.ocr.predict(img)
         
         if not result or result[0] is None:
             self.logger.warning("No text detected.")
-            return []
+            return [], [], img
 
         # PaddleOCR result structure: result[0] is a list of [box, (text, confidence)]
         # box: [[x1, y1], [x2, y2], [x3, y3], [x4, y4]]
         
         raw_boxes = result[0]['rec_polys']
         raw_texts = result[0]['rec_texts']
-        # print("raw_boxes : ", raw_boxes)
+        self.logger.debug("rec_polys=%d rec_texts=%d", len(raw_boxes), len(raw_texts))
         
         # Combine to keep association: (box, text_data)
         combined_data = list(zip(raw_boxes, raw_texts))
@@ -81,7 +135,7 @@ class OCRProcessor:
             grouped_boxes.append(b_group)
             grouped_texts.append(t_group)
         
-        return grouped_boxes, grouped_texts
+        return grouped_boxes, grouped_texts, img
 
     def _sort_boxes(self, items, x_threshold=20, y_threshold=20):
         """
@@ -100,91 +154,49 @@ class OCRProcessor:
             return []
 
         # 1. Prepare data: Calculate bounding rect (min_x, min_y, max_x, max_y) for each box
-        # We keep track of indices to merge them later
+        # Boxes are normalized to float arrays once, so no per-item type checks are needed later
         n = len(items)
-        rects = []
-        for i, (box, text) in enumerate(items):
-            # box is a 2D array-like of 4 points: [[x1, y1], ..., [x4, y4]]
-            # convert to list of points to handle both numpy and list types
-            if hasattr(box, "tolist"):
-                points = box.tolist()
-            else:
-                points = box
-            
-            xs = [p[0] for p in points]
-            ys = [p[1] for p in points]
-            
-            rects.append({
-                'index': i,
-                'min_x': min(xs),
-                'max_x': max(xs),
-                'min_y': min(ys),
-                'max_y': max(ys)
-            })
-
-        # 2. Build Adjacency Graph
-        # We use an adjacency list: graph[i] = [list of connected indices]
-        adj = [[] for _ in range(n)]
-        
-        for i in range(n):
-            for j in range(i + 1, n):
-                r1 = rects[i]
-                r2 = rects[j]
-                
-                # Calculate gaps
-                def get_gap(start1, end1, start2, end2):
-                    # Gap is distance between closest edges. Overlap means gap is 0.
-                    gap = max(start1, start2) - min(end1, end2)
-                    return max(0, gap)
-
-                x_gap = get_gap(r1['min_x'], r1['max_x'], r2['min_x'], r2['max_x'])
-                y_gap = get_gap(r1['min_y'], r1['max_y'], r2['min_y'], r2['max_y'])
-                
+        boxes = [np.asarray(box, dtype=np.float32).reshape(-1, 2) for box, _ in items]
+        min_x = [float(box[:, 0].min()) for box in boxes]
+        max_x = [float(box[:, 0].max()) for box in boxes]
+        min_y = [float(box[:, 1].min()) for box in boxes]
+        max_y = [float(box[:, 1].max()) for box in boxes]
+
+        # 2. Connect nearby boxes with a plane sweep over boxes sorted by top edge.
+        # Once a box starts further than y_threshold below the current box's bottom,
+        # every later box does too, so the inner scan can stop early.
+        order = sorted(range(n), key=lambda idx: min_y[idx])
+        parent = list(range(n))
+
+        def find(idx):
+            # Union-find root lookup with path halving
+            while parent[idx] != idx:
+                parent[idx] = parent[parent[idx]]
+                idx = parent[idx]
+            return idx
+
+        for pos, i in enumerate(order):
+            # Index instead of slicing order[pos + 1:], which would copy the tail every step
+            for q in range(pos + 1, n):
+                j = order[q]
+                if min_y[j] - max_y[i] > y_threshold:
+                    break
+
+                # Gap is distance between closest edges. Overlap means gap is 0.
+                x_gap = max(0, max(min_x[i], min_x[j]) - min(max_x[i], max_x[j]))
+                y_gap = max(0, max(min_y[i], min_y[j]) - min(max_y[i], max_y[j]))
+
                 # Check thresholds
                 if x_gap <= x_threshold and y_gap <= y_threshold:
-                    adj[i].append(j)
-                    adj[j].append(i)
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[root_j] = root_i
 
-        # 3. Find Connected Components (BFS)
-        visited = [False] * n
-        grouped_items = []
-        
-        for i in range(n):
-            if not visited[i]:
-                # Start a new component
-                component_indices = []
-                stack = [i]
-                visited[i] = True
-                while stack:
-                    curr = stack.pop()
-                    component_indices.append(curr)
-                    for neighbor in adj[curr]:
-                        if not visited[neighbor]:
-                            visited[neighbor] = True
-                            stack.append(neighbor)
-                
-                # Collect items for this component
-                # Sort items within the group by Y primarily (Top-to-Bottom reading)
-                component_indices.sort(key=lambda idx: rects[idx]['min_y'])
-                
-                component = [items[idx] for idx in component_indices]
-                grouped_items.append(component)
-
-        # 4. Sort the groups themselves by their top-most coordinate
-        def get_group_y(group):
-            # Find global min_y of the group
-            min_y = float('inf')
-            for item in group:
-                box = item[0]
-                if hasattr(box, "tolist"):
-                    points = box.tolist()
-                else:
-                    points = box
-                current_min = min(p[1] for p in points)
-                if current_min < min_y:
-                    min_y = current_min
-            return min_y
-
-        grouped_items.sort(key=get_group_y)
-
-        return grouped_items
\ No newline at end of file
+        # 3. Collect Connected Components
+        # Iterating in min_y order keeps the items within each group sorted Top-to-Bottom
+        # (reading order), and the groups themselves ordered by their top-most coordinate.
+        components = {}
+        for idx in order:
+            components.setdefault(find(idx), []).append(idx)
+
+        return [[items[idx] for idx in indices] for indices in components.values()]
\ No newline at end of file
@@ -1,8 +1,32 @@
+import hashlib
+import os
+import shelve
+import threading
+import time
 import ollama
 from ollama import Client
 
+# One lock per cache file, shared by every translator in the process (each Streamlit
+# session builds its own translator, and reruns call it from different threads)
+_cache_locks = {}
+_cache_locks_guard = threading.Lock()
+
+
+def _cache_lock(path):
+    """Returns the process-wide lock guarding the cache file at path."""
+    key = os.path.abspath(path)
+    with _cache_locks_guard:
+        lock = _cache_locks.get(key)
+        if lock is None:
+            lock = _cache_locks[key] = threading.Lock()
+        return lock
+
+
 class OllamaTranslator:
-    def __init__(self, host="http://localhost:11434", default_model="llama3", log_callback=None):
+    # Seconds a client.list() response is reused by connect() and list_models()
+    LIST_CACHE_TTL = 5.0
+
+    def __init__(self, host="http://localhost:11434", default_model="llama3", log_callback=None, cache_path="translation_cache.db"):
         """
         Initialize the OllamaTranslator.
         
@@ -10,11 +34,21 @@ class OllamaTranslator:
             host (str): The URL of the Ollama server.
             default_model (str): The default model to use if none is specified.
             log_callback (callable): A function to log messages.
+            cache_path (str, optional): Path of the on-disk translation cache.
+                                        If None, translations are only cached in memory.
+                                        The file is opened per lookup/store under a lock,
+                                        since dbm handles may not cross threads.
         """
         self.host = host
         self.default_model = default_model
         self.client = Client(host=host)
         self.log_callback = log_callback
+        self._list_cache = (0.0, None)
+
+        # Cache translations so repeated texts (SFX, names) skip the LLM call
+        self.cache_path = cache_path
+        self._memory_cache = {}
+        self._memory_lock = threading.Lock()
 
     def log(self, message):
         """Log a message using the callback or print."""
@@ -31,7 +65,7 @@ class OllamaTranslator:
             bool: True if connection is successful, False otherwise.
         """
         try:
-            self.client.list()
+            self._list()
             return True
         except Exception as e:
             self.log(f"Error connecting to Ollama server at {self.host}: {e}")
@@ -46,7 +80,7 @@ class OllamaTranslator:
         """
         self.log("Listing models...")
         try:
-            response = self.client.list()
+            response = self._list()
             models_list = response.get('models', [])
             # Extract model names from the response
             if models_list:
@@ -56,7 +90,20 @@ class OllamaTranslator:
             self.log(f"Error listing models: {e}")
             return []
 
-    def translate_text(self, text, model, prompt, json_format=False) -> str | None:
+    def _list(self):
+        """
+        Returns the server's model list, reusing a response younger than LIST_CACHE_TTL
+        so a UI refresh that checks the connection and lists models makes one request.
+        """
+        fetched_at, response = self._list_cache
+        if response is not None and time.monotonic() - fetched_at < self.LIST_CACHE_TTL:
+            return response
+
+        response = self.client.list()
+        self._list_cache = (time.monotonic(), response)
+        return response
+
+    def translate_text(self, text, model, prompt, json_format=False, use_cache=True) -> str | None:
         """
         Translates text using the specified model and prompt.
         
@@ -65,6 +112,8 @@ class OllamaTranslator:
             model (str): The name of the model to use.
             prompt (str): The start prompt template.
             json_format (bool): Whether to enforce JSON output format.
+            use_cache (bool): If False, always asks the model; the fresh result then
+                              replaces the cached one.
             
         Returns:
             str: The translated text, or None if an error occurs.
@@ -73,6 +122,13 @@ class OllamaTranslator:
             model = self.default_model
 
         try:
+            # Return the cached translation if this exact request was seen before
+            cache_key = self._cache_key(text, model, prompt, json_format)
+            if use_cache:
+                cached = self._load_cache(cache_key)
+                if cached is not None:
+                    return cached
+
             # Combine prompt and text as requested
             full_prompt = f"{prompt}\n\n{text}"
             
@@ -90,7 +146,9 @@ class OllamaTranslator:
             
             # Extract and return the content
             if 'message' in response and 'content' in response['message']:
-                return response['message']['content']
+                content = response['message']['content']
+                self._store_cache(cache_key, content)
+                return content
             else:
                 self.log("Unexpected response format from Ollama.")
                 return None
@@ -99,6 +157,47 @@ class OllamaTranslator:
             self.log(f"Error during translation: {e}")
             return None
 
+    def _cache_key(self, text, model, prompt, json_format) -> str:
+        """Builds a compact cache key from everything that affects the translation."""
+        raw = f"{model}|{json_format}|{prompt}|{text}".encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def _load_cache(self, key):
+        """Returns a cached translation, or None if it is missing or the cache is unreadable."""
+        if not self.cache_path:
+            with self._memory_lock:
+                return self._memory_cache.get(key)
+        try:
+            with _cache_lock(self.cache_path), shelve.open(self.cache_path) as cache:
+                return cache.get(key)
+        except Exception as e:
+            self.log(f"Could not read translation cache: {e}")
+            return None
+
+    def _store_cache(self, key, content):
+        """Stores a translation in the cache, writing it to disk if persistent."""
+        if not self.cache_path:
+            with self._memory_lock:
+                self._memory_cache[key] = content
+            return
+        try:
+            with _cache_lock(self.cache_path), shelve.open(self.cache_path) as cache:
+                cache[key] = content
+        except Exception as e:
+            self.log(f"Could not write translation cache: {e}")
+
+    def clear_cache(self):
+        """Removes every cached translation."""
+        if not self.cache_path:
+            with self._memory_lock:
+                self._memory_cache.clear()
+            return
+        try:
+            with _cache_lock(self.cache_path), shelve.open(self.cache_path) as cache:
+                cache.clear()
+        except Exception as e:
+            self.log(f"Could not clear translation cache: {e}")
+
 if __name__ == "__main__":
     # Test utilization
     translator = OllamaTranslator()
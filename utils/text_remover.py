@@ -17,12 +17,12 @@ class TextRemover:
         logging.basicConfig(level=log_level)
         self.logger = logging.getLogger(__name__)
 
-    def remove_text(self, image_path, grouped_boxes, dilation_iter=2):
+    def remove_text(self, img, grouped_boxes, dilation_iter=2):
         """
         Removes text from the image using the provided bounding boxes.
 
         Args:
-            image_path (str): Path to the original image.
+            img (numpy.ndarray): The original image in BGR format (as returned by OCRProcessor.perform_ocr).
             grouped_boxes (list): List of groups, where each group is a list of boxes.
                                   Each box is a list/array of coordinates [[x1, y1], ...].
             dilation_iter (int): Number of iterations for mask dilation to ensure full coverage.
@@ -30,12 +30,9 @@ class TextRemover:
         Returns:
             numpy.ndarray: The image with text removed (inpainted).
         """
-        self.logger.info(f"Removing text from: {image_path}")
-        
-        # 1. Read the image
-        img = cv2.imread(image_path)
+        # 1. Validate the image
         if img is None:
-            self.logger.error(f"Could not read image: {image_path}")
+            self.logger.error("No image provided for text removal.")
             return None
 
         # 2. Create a mask initialized to black
@@ -52,16 +49,21 @@ class TextRemover:
         
         self.logger.info(f"Created mask for {count} text boxes.")
 
-        # 4. Dilate the mask to cover edges and artifacts
+        # 4. Nothing to remove (no boxes, or all outside the frame)
+        if cv2.countNonZero(mask) == 0:
+            self.logger.info("Empty mask, skipping inpaint.")
+            return img.copy()
+
+        # 5. Dilate the mask to cover edges and artifacts
         if dilation_iter > 0:
             kernel = np.ones((3, 3), np.uint8)
             mask = cv2.dilate(mask, kernel, iterations=dilation_iter)
 
-        # 5. Perform inpainting
+        # 6. Perform inpainting
         try:
             inpainted_img = cv2.inpaint(img, mask, self.inpaint_radius, self.method)
             self.logger.info("Inpainting completed successfully.")
             return inpainted_img
         except Exception as e:
             self.logger.error(f"Error during inpainting: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -1,7 +1,197 @@
+import bisect
+import functools
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+FONT_EXTENSIONS = frozenset((".ttf", ".otf"))
+
+# System fonts (Windows) used when ./fonts has none, probed once at import
+_SYSTEM_FONT_CANDIDATES = (
+    "C:/Windows/Fonts/tahoma.ttf",
+    "C:/Windows/Fonts/LeelawUI.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/seguiemj.ttf",
+)
+_DEFAULT_FONT_PATH = next((f for f in _SYSTEM_FONT_CANDIDATES if os.path.exists(f)), "arial.ttf") # Ultimate fallback
+
+# Encoder settings for JPEG output: a single baseline pass without the optimizer scan
+JPEG_EXTENSIONS = frozenset((".jpg", ".jpeg"))
+JPEG_SAVE_PARAMS = {"quality": 85, "optimize": False, "progressive": False, "subsampling": 2}
+
+# Fitted layouts kept across pages (recurring SFX, names, "..." balloons)
+FIT_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=256)
+def _get_font(path, size):
+    """
+    Loads a TrueType font once per (path, size), falling back to PIL's default font.
+    Fonts are only read for metrics and drawing, so instances are safe to share.
+    The cache is process-wide: the same path/size pairs recur across balloons and pages.
+    """
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception:
+        # Fallback; depending on the PIL build the default font may not honour the size
+        return ImageFont.load_default(size)
+
+
+@functools.lru_cache(maxsize=256)
+def _line_height(path, size):
+    """
+    Line height (ascent + descent) of a font at a size. It does not depend on the text,
+    so the fitting search looks it up once per size instead of querying FreeType per probe.
+    """
+    return sum(_get_font(path, size).getmetrics())
+
+
+@functools.lru_cache(maxsize=None)
+def _icu():
+    """PyICU, imported on first use; None if it is not installed."""
+    try:
+        import icu
+    except ImportError:
+        return None
+    return icu
+
+
+@functools.lru_cache(maxsize=1024)
+def _line_breaks(text):
+    """
+    Offsets inside text where a line may start, from ICU's line-break rules (UAX #14, with
+    dictionary segmentation for Thai, which does not separate words with spaces).
+    Returns an empty tuple when PyICU is not installed, leaving spaces as the only breaks.
+    """
+    icu = _icu()
+    if icu is None or not text:
+        return ()
+
+    # BreakIterator is not thread-safe, so each call (from any layout thread) gets its own
+    breaker = icu.BreakIterator.createLineInstance(icu.Locale("th_TH"))
+    breaker.setText(text)
+    offsets = list(breaker)
+
+    # ICU counts UTF-16 code units; map back to str indices when there are astral characters
+    if any(ord(ch) > 0xFFFF for ch in text):
+        index = {}
+        unit = 0
+        for pos, ch in enumerate(text):
+            index[unit] = pos
+            unit += 2 if ord(ch) > 0xFFFF else 1
+        offsets = [index[offset] for offset in offsets if offset in index]
+
+    return tuple(offset for offset in offsets if 0 < offset < len(text))
+
+
+# Single-character advance widths per (font path, size), filled lazily as characters are seen
+_advance_cache = {}
+
+
+def _advances(font):
+    """Returns the shared {char: advance width} table for a font."""
+    key = (getattr(font, "path", None), getattr(font, "size", None))
+    table = _advance_cache.get(key)
+    if table is None:
+        table = _advance_cache[key] = {}
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def _jit_kernels():
+    """
+    Compiles the numba kernels on first use, so importing this module does not pay for numba.
+    numba is optional; without it large box groups use numpy reductions and the size search
+    starts from the closed-form estimate.
+
+    Returns:
+        tuple: (reduce_bbox, predict_size), or None if numba is not installed.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True)
+    def reduce_bbox(points):
+        """Single-pass (min_x, min_y, max_x, max_y) over an (N, 2) float32 point array."""
+        min_x = max_x = points[0, 0]
+        min_y = max_y = points[0, 1]
+        for i in range(1, points.shape[0]):
+            x = points[i, 0]
+            y = points[i, 1]
+            if x < min_x:
+                min_x = x
+            elif x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            elif y > max_y:
+                max_y = y
+        return min_x, min_y, max_x, max_y
+
+    @njit(cache=True)
+    def wrap_fits(codes, advances, space, can_break, max_width, max_lines):
+        """
+        Greedy word wrap over character codes with the same break rules as
+        Typesetter._wrap_text, using per-character advances only (no kerning).
+        can_break marks the ICU break opportunities besides spaces.
+        Returns whether the text fits in max_lines lines of at most max_width.
+        """
+        n = codes.shape[0]
+        lines = 0
+        i = 0
+        while i < n:
+            while i < n and codes[i] == space:
+                i += 1
+            if i >= n:
+                break
+            lines += 1
+            if lines > max_lines:
+                return False
+
+            width = advances[codes[i]]
+            if width > max_width:
+                return False
+            j = i + 1
+            while j < n and width + advances[codes[j]] <= max_width:
+                width += advances[codes[j]]
+                j += 1
+
+            if j < n and codes[j] != space and not can_break[j]:
+                k = j - 1
+                while k > i and codes[k] != space and not can_break[k]:
+                    k -= 1
+                if k > i:
+                    j = k
+            i = j
+        return True
+
+    @njit(cache=True)
+    def predict_size(codes, ref_advances, space, can_break, ref_size, ref_line_h, min_size, max_size, max_width, max_height):
+        """
+        Bisects for the largest size whose wrapped text fits, scaling advances and line height
+        linearly from the reference size. Returns min_size - 1 if even min_size overflows.
+        """
+        low = min_size
+        high = max_size
+        best = min_size - 1
+        while low <= high:
+            size = (low + high) // 2
+            scale = size / ref_size
+            max_lines = int(max_height // (ref_line_h * scale))
+            if max_lines > 0 and wrap_fits(codes, ref_advances * scale, space, can_break, max_width, max_lines):
+                best = size
+                low = size + 1
+            else:
+                high = size - 1
+        return best
+
+    return reduce_bbox, predict_size
+
+
 class Typesetter:
     def __init__(self, font_name=None):
         """
@@ -19,6 +209,26 @@ class Typesetter:
         self.fonts_dir = os.path.join(self.project_root, "fonts")
         
         self.font_path = None
+        self._current_font_name = None
+        self._fonts_cache = None
+
+        # Encoding/saving runs in the background so the next page can be typeset meanwhile
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._pending_saves = []
+
+        # Groups on a page are laid out concurrently; drawing stays on the calling thread
+        self._layout_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        self._last_fit_size = None
+        # Fitted layouts keyed by (font path, text, box width, box height), oldest evicted first.
+        # The exact box size is part of the key, so a page renders the same whatever came before.
+        self._fit_cache = {}
+
+        # Text measurements keyed by (id(font), text), reset on every overlay_text call.
+        # Fonts come from the shared _get_font cache, so ids stay valid within a call.
+        self._width_cache = {}
+        # Rendered line masks for the current page, keyed by (line, font, subpixel offset);
+        # None marks a line drawn once so far
+        self._mask_cache = {}
 
         # Try to set the requested font or a default one
         self.set_font(font_name)
@@ -26,18 +236,28 @@ class Typesetter:
     def get_available_fonts(self):
         """
         Returns a list of font filenames found in the ./fonts directory.
+        The directory is scanned once per Typesetter.
         """
-        if not os.path.exists(self.fonts_dir):
-            return []
-        
-        fonts = [f for f in os.listdir(self.fonts_dir) if f.lower().endswith(('.ttf', '.otf'))]
-        return sorted(fonts)
+        if self._fonts_cache is None:
+            if not os.path.exists(self.fonts_dir):
+                self._fonts_cache = []
+            else:
+                with os.scandir(self.fonts_dir) as entries:
+                    fonts = [
+                        entry.name for entry in entries
+                        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in FONT_EXTENSIONS
+                    ]
+                self._fonts_cache = sorted(fonts)
+
+        return list(self._fonts_cache)
 
     def set_font(self, font_name):
         """
         Sets the current font to the specified font name found in ./fonts 
         or a specific path.
         """
+        self._current_font_name = font_name
+
         # 1. Try: specific path provided and exists
         # if font_name and os.path.exists(font_name):
         #     self.font_path = font_name
@@ -64,17 +284,7 @@ class Typesetter:
             return
 
         # 4. Fallback: System fonts (Windows)
-        possible_fonts = [
-            "C:/Windows/Fonts/tahoma.ttf",
-            "C:/Windows/Fonts/LeelawUI.ttf",
-            "C:/Windows/Fonts/arial.ttf",
-            "C:/Windows/Fonts/seguiemj.ttf" 
-        ]
-        self.font_path = "arial.ttf" # Ultimate fallback
-        for f in possible_fonts:
-            if os.path.exists(f):
-                self.font_path = f
-                break
+        self.font_path = _DEFAULT_FONT_PATH
         print(f"Warning: No fonts found in local directory. Using system font: {self.font_path}")
 
     def calculate_consolidated_box(self, boxes):
@@ -91,24 +301,87 @@ class Typesetter:
         if not boxes:
             return 0, 0, 0, 0
 
-        # Flatten all points from all boxes into a single list
-        all_points = []
-        for box in boxes:
-            all_points.extend(box)
-
-        if not all_points:
+        num_points = sum(len(box) for box in boxes)
+        if num_points == 0:
             return 0, 0, 0, 0
 
-        # Convert to numpy array for efficient min/max calculation
-        pts = np.array(all_points, dtype=np.float32)
+        # Large groups: convert straight from the source structure; numpy's per-call overhead pays off
+        if num_points > 128:
+            try:
+                pts = np.asarray(boxes, dtype=np.float32).reshape(-1, 2)
+            except ValueError:
+                # Boxes with differing point counts cannot form one array
+                pts = np.concatenate([np.asarray(box, dtype=np.float32).reshape(-1, 2) for box in boxes])
+            kernels = _jit_kernels() if len(pts) > 256 else None
+            if kernels is not None:
+                # One compiled pass instead of two reductions over the array
+                min_x, min_y, max_x, max_y = kernels[0](pts)
+            else:
+                min_x, min_y = pts.min(axis=0)
+                max_x, max_y = pts.max(axis=0)
+            return int(min_x), int(min_y), int(max_x), int(max_y)
 
-        min_x = np.min(pts[:, 0])
-        max_x = np.max(pts[:, 0])
-        min_y = np.min(pts[:, 1])
-        max_y = np.max(pts[:, 1])
+        # Typical groups have a handful of points, where a plain single pass is faster
+        min_x = min_y = float('inf')
+        max_x = max_y = float('-inf')
+        for box in boxes:
+            for x, y in box:
+                if x < min_x:
+                    min_x = x
+                if x > max_x:
+                    max_x = x
+                if y < min_y:
+                    min_y = y
+                if y > max_y:
+                    max_y = y
 
         return int(min_x), int(min_y), int(max_x), int(max_y)
 
+    def _consolidated_boxes(self, grouped_boxes):
+        """
+        calculate_consolidated_box for every group of a page.
+
+        PaddleOCR returns each polygon as a small ndarray, where the per-group scalar loop
+        pays for a numpy scalar on every coordinate. Such pages are reduced in one pass over
+        an (N, points, 2) array instead; plain lists stay on the per-group path, which is
+        faster for them.
+        """
+        counts = [len(boxes) if boxes is not None else 0 for boxes in grouped_boxes]
+        flat = [box for boxes, count in zip(grouped_boxes, counts) if count for box in boxes]
+        all_boxes = None
+        if flat and isinstance(flat[0], np.ndarray):
+            try:
+                all_boxes = np.asarray(flat, dtype=np.float32)
+            except ValueError:
+                # Polygons with differing point counts cannot form one array
+                pass
+        if all_boxes is None or all_boxes.ndim != 3 or all_boxes.shape[1] == 0 or all_boxes.shape[2] != 2:
+            return [self.calculate_consolidated_box(boxes) if count else (0, 0, 0, 0)
+                    for boxes, count in zip(grouped_boxes, counts)]
+
+        mins = all_boxes.min(axis=1)
+        maxs = all_boxes.max(axis=1)
+
+        # Reduce each group's run of boxes; empty groups have no run and are filled in below
+        offsets = []
+        start = 0
+        for count in counts:
+            if count:
+                offsets.append(start)
+                start += count
+        group_mins = np.minimum.reduceat(mins, offsets).tolist()
+        group_maxs = np.maximum.reduceat(maxs, offsets).tolist()
+
+        extents = iter(zip(group_mins, group_maxs))
+        result = []
+        for count in counts:
+            if count:
+                (min_x, min_y), (max_x, max_y) = next(extents)
+                result.append((int(min_x), int(min_y), int(max_x), int(max_y)))
+            else:
+                result.append((0, 0, 0, 0))
+        return result
+
     def overlay_text(self, image_path: str, grouped_boxes: list, grouped_texts: list, output_path: str = None, font_name: str = None, font_size: int = None, padding: int = 0):
         """
         Overlays new text onto the image using the bounding boxes from PaddleOCR.
@@ -118,7 +391,9 @@ class Typesetter:
             grouped_boxes (list): List of groups of boxes (from PaddleOCR).
                                   Each box is [[x1, y1], [x2, y2], [x3, y3], [x4, y4]].
             grouped_texts (list): List of groups of text strings to write.
-            output_path (str, optional): Path to save the output image.
+            output_path (str, optional): Path to save the output image. The file is written in the
+                                         background; call flush() before reading it. If None,
+                                         nothing is encoded. JPEG uses JPEG_SAVE_PARAMS.
             font_name (str, optional): Name of the font to use.
             font_size (int, optional): Fixed font size to use. If None, calculates best fit.
             padding (int, optional): Padding to reduce the text box area from the detected box.
@@ -126,167 +401,463 @@ class Typesetter:
         Returns:
             Image: The PIL Image object with text drawn.
         """
-        if font_name:
+        # Re-resolving the font is only needed when a different one is requested
+        if font_name and font_name != self._current_font_name:
             self.set_font(font_name)
 
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
 
         try:
-            image = Image.open(image_path).convert("RGBA")
+            # Only opaque text is drawn and the result is saved as RGB, so an RGB source
+            # (typical for JPEG scans) is used as-is; other modes go straight to RGB.
+            # Dropping alpha before or after drawing opaque pixels gives the same result.
+            image = Image.open(image_path)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
         except Exception as e:
             print(f"Failed to load image: {e}")
             return None
 
         draw = ImageDraw.Draw(image)
+        self._width_cache.clear()
+        self._mask_cache.clear()
 
-        # Loop through groups
-        for boxes, text in zip(grouped_boxes, grouped_texts):
-             if not boxes or not text:
-                 continue
-
-             # Consolidate the box
-             min_x, min_y, max_x, max_y = self.calculate_consolidated_box(boxes)
-             
-             # Apply padding
-             min_x += padding
-             min_y += padding
-             max_x -= padding
-             max_y -= padding
-             
-             box_width = max_x - min_x
-             box_height = max_y - min_y
-             
-             if box_width <= 0 or box_height <= 0:
-                 continue
-
-             # Text is already a string in 1D list
-             full_text = text
-             if not full_text.strip():
-                 continue
-
-             if font_size:
-                 # Use fixed font size
-                 try:
-                     font = ImageFont.truetype(self.font_path, font_size)
-                 except:
-                     font = ImageFont.load_default() # Fallback, though load_default doesn't take size usually (it's bitmap)
-                     # For TrueType fallback:
-                     # font = ImageFont.truetype("arial.ttf", font_size) 
-                     
-                 lines = self._wrap_text(full_text, font, box_width, draw)
-             else:
-                 # Calculate best font size and wrapped lines
-                 font, lines = self._fit_text(full_text, box_width, box_height, draw)
-                 
-             # Calculate total text block height
-             total_text_height = 0
-             line_heights = []
-             for line in lines:
-                 bbox = draw.textbbox((0, 0), line, font=font)
-                 h = bbox[3] - bbox[1]
-                 line_heights.append(h)
-                 total_text_height += h
-                 
-             # Center vertically
-             current_y = min_y + (box_height - total_text_height) / 2
-                 
-             # Draw each line
-             for line, h in zip(lines, line_heights):
-                 bbox = draw.textbbox((0, 0), line, font=font)
-                 w = bbox[2] - bbox[0]
-                 # Center horizontally
-                 x = min_x + (box_width - w) / 2
-                     
-                 # Draw text with black fill (assuming light background or cleared text)
-                 draw.text((x, current_y), line, font=font, fill="black")
-                 current_y += h
+        # 1. Resolve the text region of every group
+        bboxes = self._consolidated_boxes(grouped_boxes)
+        regions = [self._group_region(bbox, text, padding) for bbox, text in zip(bboxes, grouped_texts)]
+
+        # 2. Lay out the groups in parallel; this phase only measures and never touches the image.
+        # Identical text in a similar-sized box (repeated SFX, names) is laid out once, for the
+        # first such box in page order, which keeps the output independent of thread timing.
+        # Every group starts from the size fitted last, since balloons tend to share a size.
+        seed = self._last_fit_size
+        layout_jobs = {}
+        for region in regions:
+            if region is None:
+                continue
+            key = self._layout_key(region, font_size)
+            if key not in layout_jobs:
+                layout_jobs[key] = self._layout_pool.submit(self._layout_group, region, font_size, seed)
+
+        # 3. Draw serially (ImageDraw is not safe to share across threads)
+        draw_line = self._draw_line
+        for region in regions:
+            if region is None:
+                continue
+            min_x, min_y, box_width, box_height, full_text = region
+
+            font, lines, line_widths, line_height = layout_jobs[self._layout_key(region, font_size)].result()
+            if not font_size and (max(line_widths) > box_width or line_height * len(lines) > box_height):
+                # The shared layout was fitted to a slightly larger box
+                font, lines, line_widths, line_height = self._layout_group(region, font_size, seed)
+            if not font_size:
+                self._last_fit_size = getattr(font, "size", None)
+
+            # Center vertically; lines share one height, so each row is an offset from the top
+            # rather than a running sum that could drift
+            top = min_y + (box_height - line_height * len(lines)) / 2
+
+            # Center each line horizontally
+            positions = [(min_x + (box_width - w) / 2, top + row * line_height) for row, w in enumerate(line_widths)]
+
+            # Draw text with black fill (assuming light background or cleared text)
+            for line, (x, y) in zip(lines, positions):
+                draw_line(image, draw, x, y, line, font)
         
-        image = image.convert("RGB")
         if output_path:
-            image.save(output_path)
+            # Saved in the background; call flush() before reading the file back.
+            # The returned image must not be modified until then.
+            save_params = JPEG_SAVE_PARAMS if os.path.splitext(output_path)[1].lower() in JPEG_EXTENSIONS else {}
+            self._pending_saves.append((output_path, self._io_pool.submit(image.save, output_path, **save_params)))
             
         return image
 
-    def _fit_text(self, text, max_width, max_height, draw):
+    def _draw_line(self, image, draw, x, y, line, font):
+        """
+        Draws one line in black at (x, y), like draw.text.
+        A line that appears again on the page at the same subpixel position (SFX, names, a
+        fixed-size layout shared by identical boxes) is rasterized once into a mask and pasted
+        from then on, so FreeType shapes it only once. Lines seen once are drawn directly,
+        since building a mask costs more than drawing.
+        """
+        if x < 0 or y < 0 or "\n" in line:
+            # draw.text splits negative coordinates and multiline strings differently
+            draw.text((x, y), line, font=font, fill="black")
+            return
+
+        ix = int(x)
+        iy = int(y)
+        fx = x - ix
+        fy = y - iy
+        key = (line, font, fx, fy)
+        entry = self._mask_cache.get(key)
+        if entry is None:
+            if key not in self._mask_cache:
+                self._mask_cache[key] = None
+                draw.text((x, y), line, font=font, fill="black")
+                return
+
+            # Margins keep glyphs with a negative bearing and the subpixel shift inside the mask
+            left, top, right, bottom = font.getbbox(line)
+            ox = 1 - min(0, math.floor(left))
+            oy = 1 - min(0, math.floor(top))
+            mask = Image.new("L", (ox + math.ceil(right) + 2, oy + math.ceil(bottom) + 2), 0)
+            ImageDraw.Draw(mask).text((ox + fx, oy + fy), line, font=font, fill=255)
+            entry = self._mask_cache[key] = (mask, ox, oy)
+
+        mask, ox, oy = entry
+        image.paste((0, 0, 0), (ix - ox, iy - oy), mask)
+
+    def _group_region(self, bbox, text, padding):
+        """
+        Computes the padded text region for one group from its consolidated box.
+
+        Returns:
+            tuple: (min_x, min_y, box_width, box_height, text), or None if there is nothing to draw.
+        """
+        if not text:
+            return None
+
+        min_x, min_y, max_x, max_y = bbox
+
+        # Apply padding
+        min_x += padding
+        min_y += padding
+        max_x -= padding
+        max_y -= padding
+
+        box_width = max_x - min_x
+        box_height = max_y - min_y
+
+        if box_width <= 0 or box_height <= 0:
+            return None
+
+        # Text is already a string in 1D list
+        if not text.strip():
+            return None
+
+        return min_x, min_y, box_width, box_height, text
+
+    def _layout_key(self, region, font_size):
+        """
+        Key under which a region's layout is shared within a page.
+        Fitted layouts are shared across boxes within the same 4px size bucket; fixed-size
+        wrapping depends on the exact width, so it is only shared by identical boxes.
+        """
+        _, _, box_width, box_height, text = region
+        if font_size:
+            return text, box_width
+        return text, box_width // 4, box_height // 4
+
+    def _layout_group(self, region, font_size, seed=None):
+        """
+        Chooses the font and wrapped lines for one region and measures them.
+
+        Returns:
+            tuple: (font, lines, line_widths, line_height)
+        """
+        _, _, box_width, box_height, full_text = region
+
+        if not font_size:
+            # Calculate best font size and wrapped lines; the fit already measured them
+            key = (self.font_path, full_text, box_width, box_height)
+            layout = self._fit_cache.get(key)
+            if layout is None:
+                font, lines, line_widths, line_height = self._fit_text(full_text, box_width, box_height, seed=seed)
+                layout = (font, tuple(lines), tuple(line_widths), line_height)
+                if len(self._fit_cache) >= FIT_CACHE_SIZE:
+                    # Layout threads share the cache; a concurrent change just skips this eviction
+                    try:
+                        self._fit_cache.pop(next(iter(self._fit_cache)), None)
+                    except (RuntimeError, StopIteration):
+                        pass
+                self._fit_cache[key] = layout
+            return layout
+
+        # Use fixed font size
+        font = _get_font(self.font_path, font_size)
+        lines = self._wrap_text(full_text, font, box_width)
+
+        # Line height is a font-level constant (ascent + descent), not a per-line measurement
+        line_height = _line_height(self.font_path, font_size)
+        line_widths = [self._line_width(line, font) for line in lines]
+
+        return font, lines, line_widths, line_height
+
+    def flush(self):
+        """
+        Waits until all images queued by overlay_text are written to disk.
+        Every save is waited for, even after one fails.
+
+        Returns:
+            list: (output_path, exception) for each image that could not be saved.
+        """
+        pending, self._pending_saves = self._pending_saves, []
+        failed = []
+        for output_path, future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                failed.append((output_path, e))
+        return failed
+
+    def _fit_text(self, text, max_width, max_height, seed=None):
         """
         Finds the largest font size such that the text, when wrapped, fits within the max_width and max_height.
+        Text metrics scale roughly linearly with font size, so instead of bisecting 10..100 blindly,
+        each probe's layout is used to predict the next size; bisection only finishes the search.
+        When the prediction is max_size and it fits, or min_size and it does not, one probe
+        settles the search.
+
+        Args:
+            seed (int, optional): Size to probe first, e.g. the size chosen for the previous balloon.
+                                  Only used without the compiled kernel, and only when it is
+                                  within 25% of the metrics-based estimate.
+
+        Returns:
+            tuple: (font, lines, line_widths, line_height) for the chosen size, so callers
+                   do not need to measure the lines again.
         """
         min_size = 10
         max_size = 100
-        best_font = ImageFont.truetype(self.font_path, min_size)
-        best_lines = [text]
-        
-        # Binary search for font size
+        ref_size = 40
+        max_predictions = 3
+
+        # A box shorter than one line at the smallest size fits nothing; skip the search
+        min_line_h = _line_height(self.font_path, min_size)
+        if min_line_h > max_height:
+            font = _get_font(self.font_path, min_size)
+            return font, [text], [self._line_width(text, font)], min_line_h
+
+        ref_font = _get_font(self.font_path, ref_size)
+        line_h = _line_height(self.font_path, ref_size)
+
+        kernels = _jit_kernels()
+        if kernels is not None:
+            # Simulate the whole search on reference advances in compiled code; the exact
+            # probes below then only have to confirm the predicted size and its neighbour
+            probe = self._predicted_size(kernels[1], text, ref_font, ref_size, line_h, min_size, max_size, max_width, max_height)
+        else:
+            # Closed-form first guess from metrics at the reference size: the text area must fit
+            # the box area, a single line must fit the height, and the widest word must fit the width
+            text_w = ref_font.getlength(text)
+            bounds = (0,) + _line_breaks(text) + (len(text),)
+            word_w = max(ref_font.getlength(word) for a, b in zip(bounds, bounds[1:]) for word in text[a:b].split(' '))
+            scale = max_height / line_h
+            if text_w > 0:
+                scale = min(scale, math.sqrt(max_width * max_height / (text_w * line_h)))
+            if word_w > 0:
+                scale = min(scale, max_width / word_w)
+            probe = min(max(int(scale * ref_size), min_size), max_size)
+
+            # Balloons on the same page tend to share a size, so a previous result close to the
+            # estimate is usually the better first probe; one far from it is just a different box
+            if seed and probe * 0.8 <= seed <= probe * 1.25:
+                probe = min(max(seed, min_size), max_size)
+
+        best = None
         low = min_size
         high = max_size
-        
+        attempts = 0
+
         while low <= high:
-            mid = (low + high) // 2
-            try:
-                font = ImageFont.truetype(self.font_path, mid)
-            except:
-                font = ImageFont.load_default()
-            
-            lines = self._wrap_text(text, font, max_width, draw)
-            
-            # Calculate total height
-            total_h = 0
-            fits_width = True
-            for line in lines:
-                bbox = draw.textbbox((0, 0), line, font=font)
-                w = bbox[2] - bbox[0]
-                h = bbox[3] - bbox[1]
-                total_h += h
-                if w > max_width:
-                    fits_width = False
-            
-            if total_h <= max_height and fits_width:
+            fits, font, lines, line_widths, line_height = self._try_size(text, probe, max_width, max_height)
+            attempts += 1
+            if fits:
                 # fits, try larger
-                best_font = font
-                best_lines = lines
-                low = mid + 1
+                best = (font, lines, line_widths, line_height)
+                low = probe + 1
             else:
                 # too big, try smaller
-                high = mid - 1
-                
-        return best_font, best_lines
+                high = probe - 1
+
+            if low > high:
+                break
+
+            if attempts < max_predictions:
+                # Rescale by how much room the probe's layout left (or lacked)
+                width = max(line_widths)
+                height = line_height * len(lines)
+                ratio = max_height / height
+                if width > 0:
+                    ratio = min(ratio, max_width / width)
+                probe = min(max(int(probe * ratio), low), high)
+            else:
+                probe = (low + high) // 2
+
+        if best is None:
+            # Nothing fits: smallest size, unwrapped
+            font = _get_font(self.font_path, min_size)
+            best = (font, [text], [self._line_width(text, font)], min_line_h)
+
+        return best
+
+    def _predicted_size(self, predict_size, text, ref_font, ref_size, ref_line_h, min_size, max_size, max_width, max_height):
+        """
+        Predicts the fitted size with the compiled layout kernel.
+        Glyph advances scale linearly with the pixel size, so each distinct character is
+        measured once at the reference size and the text is encoded as indices into that table.
+        """
+        advances = _advances(ref_font)
+        get_len = ref_font.getlength
+        index = {}
+        table = []
+        codes = np.empty(len(text), dtype=np.int32)
+        for pos, ch in enumerate(text):
+            code = index.get(ch)
+            if code is None:
+                width = advances.get(ch)
+                if width is None:
+                    width = advances[ch] = get_len(ch)
+                code = index[ch] = len(table)
+                table.append(width)
+            codes[pos] = code
+
+        space = index.get(' ', -1)
+        can_break = np.zeros(len(text), dtype=np.bool_)
+        breaks = _line_breaks(text)
+        if breaks:
+            can_break[list(breaks)] = True
+        size = predict_size(codes, np.asarray(table, dtype=np.float64), space, can_break, ref_size, ref_line_h,
+                            min_size, max_size, float(max_width), float(max_height))
+        return min(max(size, min_size), max_size)
+
+    def _try_size(self, text, size, max_width, max_height):
+        """
+        Wraps text at the given font size and checks whether it fits within max_width and max_height.
+
+        Returns:
+            tuple: (fits, font, lines, line_widths, line_height). line_widths may stop early
+                   when the size does not fit.
+        """
+        font = _get_font(self.font_path, size)
+
+        lines = self._wrap_text(text, font, max_width)
+
+        # Calculate total height
+        line_height = _line_height(self.font_path, size)
+        total_h = line_height * len(lines)
+
+        # Measure line by line and stop at the first one that overflows; a failed probe's
+        # widths then end with the overflowing line, which is all the next guess needs
+        line_width = self._line_width
+        line_widths = []
+        fits = total_h <= max_height
+        for line in lines:
+            width = line_width(line, font)
+            line_widths.append(width)
+            if width > max_width:
+                fits = False
+                break
+
+        return fits, font, lines, line_widths, line_height
+
+    def _line_width(self, line, font):
+        """
+        Returns the advance width of a single line, memoized for the current overlay_text call.
+        Uses the same cache as _wrap_text, so lines it just produced are usually already measured.
+        """
+        key = (id(font), line)
+        width = self._width_cache.get(key)
+        if width is None:
+            width = font.getlength(line)
+            self._width_cache[key] = width
+        return width
 
-    def _wrap_text(self, text, font, max_width, draw):
+    def _wrap_text(self, text, font, max_width):
         """
         Wraps text to fit within max_width.
+        Each line's end is estimated from the average character width and then adjusted
+        one character advance at a time, instead of re-measuring the line after every word.
+        Lines break at the last space or ICU break opportunity when possible (Thai has no
+        spaces between words); words wider than a line are split.
         """
         lines = []
-        words = text.split(' ') # Simple space splitting
-        
-        current_line = []
-        
+        n = len(text)
+        if n == 0:
+            return [text]
+
+        # Bound to locals: these are called for every candidate line end
+        cache = self._width_cache
+        cache_get = cache.get
+        get_len = font.getlength
+        font_id = id(font)
+
         def get_width(t):
-            return draw.textlength(t, font=font)
+            key = (font_id, t)
+            width = cache_get(key)
+            if width is None:
+                width = get_len(t)
+                cache[key] = width
+            return width
 
-        for word in words:
-            # Check if adding this word exceeds width
-            test_line = ' '.join(current_line + [word])
-            if get_width(test_line) <= max_width:
-                current_line.append(word)
-            else:
-                # Push current line if valid
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    # The word itself is too long, we must split it
-                    chars = list(word)
-                    sub_line = ""
-                    for char in chars:
-                        if get_width(sub_line + char) <= max_width:
-                            sub_line += char
-                        else:
-                            lines.append(sub_line)
-                            sub_line = char
-                    current_line = [sub_line]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-            
-        return lines
\ No newline at end of file
+        advances = _advances(font)
+        breaks = _line_breaks(text)
+
+        def char_width(ch):
+            width = advances.get(ch)
+            if width is None:
+                width = advances[ch] = get_len(ch)
+            return width
+
+        # Estimated number of characters per line, from the cached advances rather than
+        # shaping the whole text at every probed size
+        avg_char_width = sum(map(char_width, text)) / n
+        estimate = max(1, int(max_width // avg_char_width)) if avg_char_width > 0 else n
+
+        i = 0
+        while i < n:
+            # Lines never start with the space they were broken at
+            while i < n and text[i] == ' ':
+                i += 1
+            if i >= n:
+                break
+
+            # Jump to the estimated end, then step forward or back to the real boundary.
+            # Steps add or remove single-character advances instead of re-measuring the
+            # growing prefix (quadratic for long unbroken words); one exact measurement
+            # at the end corrects for kerning.
+            j = min(n, i + estimate)
+            width = get_width(text[i:j])
+            while j < n and width + char_width(text[j]) <= max_width:
+                width += char_width(text[j])
+                j += 1
+            while j > i + 1 and width > max_width:
+                j -= 1
+                width -= char_width(text[j])
+            if j > i + 1 and get_width(text[i:j]) > max_width:
+                # Kerning made the advance sum optimistic. Usually one character too many,
+                # but long unbroken runs can drift further: gallop back to a prefix that
+                # fits, then bisect, instead of re-measuring one character at a time.
+                high = j - 1
+                step = 1
+                while True:
+                    low = max(i + 1, j - step)
+                    if low == i + 1 or get_width(text[i:low]) <= max_width:
+                        break
+                    high = low - 1
+                    step *= 2
+                while low < high:
+                    mid = (low + high + 1) // 2
+                    if get_width(text[i:mid]) <= max_width:
+                        low = mid
+                    else:
+                        high = mid - 1
+                j = low
+
+            # Prefer breaking at a word boundary unless the line is a single word
+            if j < n and text[j] != ' ':
+                space = text.rfind(' ', i, j)
+                if breaks:
+                    k = bisect.bisect_right(breaks, j) - 1
+                    if k >= 0 and breaks[k] > space:
+                        # Breaks sit after trailing spaces; j stays put if it is one itself
+                        space = breaks[k]
+                if space > i:
+                    j = space
+
+            lines.append(text[i:j].rstrip(' '))
+            i = j
+
+        return lines